@@ -1,12 +1,7 @@
 import os
-from dotenv import load_dotenv
-
-load_dotenv(dotenv_path='.env.local')
-
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-PORT = int(os.getenv('PORT', 5050))
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
 # WhatsApp Configuration
 WHATSAPP_SYSTEM_MESSAGE = (
@@ -34,16 +29,85 @@ LOG_EVENT_TYPES = [
     'input_audio_buffer.speech_started', 'session.created'
 ]
 
-if not OPENAI_API_KEY:
-    raise ValueError('Missing the OPENAI_API_KEY environment variable.')
+# Server VAD profiles, chosen per call with /twiml?vad=<name>
+# (individual values can be overridden with vad_threshold, vad_prefix_padding_ms, vad_silence_duration_ms)
+VAD_PROFILES = {
+    "default": {"threshold": 0.5, "prefix_padding_ms": 300, "silence_duration_ms": 500},
+    "quiet": {"threshold": 0.4, "prefix_padding_ms": 250, "silence_duration_ms": 350},
+    "noisy": {"threshold": 0.7, "prefix_padding_ms": 400, "silence_duration_ms": 650},
+}
+DEFAULT_VAD_PROFILE = "default"
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name, str(default))
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer, got {value!r}.')
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Environment-driven settings. Build it through get_settings()."""
+    openai_api_key: str
+    twilio_account_sid: Optional[str]
+    twilio_auth_token: Optional[str]
+    port: int
+
+    # RAG API Configuration
+    rag_api_base_url: str
+    rag_email: str
+    rag_password: str
+    rag_session_id: str
+
+    # Audio Configuration
+    # Base64 string for "Let me check that..." + Typing sounds.
+    # Leave empty to disable filler audio.
+    filler_audio: str
+
+    # Call recording (opt-in): directory for per-call audio/transcripts, empty disables it.
+    # recording_buffer_bytes caps the memory held by unwritten frames (base64 payloads plus
+    # per-frame overhead); frames beyond it are dropped and counted.
+    recording_dir: str
+    recording_buffer_bytes: int
+
+    # Pre-computed FAQ answers (built by build_faq_index.py); missing directory disables it
+    faq_index_dir: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Read and validate settings from the process environment."""
+        openai_api_key = os.getenv('OPENAI_API_KEY')
+        if not openai_api_key:
+            raise ValueError('Missing the OPENAI_API_KEY environment variable.')
+
+        port = _int_env('PORT', 5050)
+        recording_buffer_bytes = _int_env('CALL_RECORDING_BUFFER_BYTES', 1_000_000)
+
+        return cls(
+            openai_api_key=openai_api_key,
+            twilio_account_sid=os.getenv('TWILIO_ACCOUNT_SID'),
+            twilio_auth_token=os.getenv('TWILIO_AUTH_TOKEN'),
+            port=port,
+            rag_api_base_url=os.getenv('RAG_API_BASE_URL', 'https://40-79-241-100.sslip.io/api/v1'),
+            rag_email=os.getenv('RAG_EMAIL', 'admin@rmg-sa.com'),
+            rag_password=os.getenv('RAG_PASSWORD', 'Admin@123456'),
+            rag_session_id=os.getenv('RAG_SESSION_ID', '54e7d7fa-4496-43c0-88f5-9ceea5bf4eb5'),
+            filler_audio=os.getenv('FILLER_AUDIO', ''),
+            recording_dir=os.getenv('CALL_RECORDING_DIR', ''),
+            recording_buffer_bytes=recording_buffer_bytes,
+            faq_index_dir=os.getenv('FAQ_INDEX_DIR', 'faq_index'),
+        )
+
 
-# RAG API Configuration
-RAG_API_BASE_URL = os.getenv('RAG_API_BASE_URL', 'https://40-79-241-100.sslip.io/api/v1')
-RAG_EMAIL = os.getenv('RAG_EMAIL', 'admin@rmg-sa.com')
-RAG_PASSWORD = os.getenv('RAG_PASSWORD', 'Admin@123456')
-RAG_SESSION_ID = os.getenv('RAG_SESSION_ID', '54e7d7fa-4496-43c0-88f5-9ceea5bf4eb5')
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Load .env.local and build the Settings once.
+    Nothing is read at import time, so modules can be imported without secrets.
+    """
+    from dotenv import load_dotenv
 
-# Audio Configuration
-# Base64 string for "Let me check that..." + Typing sounds. 
-# Leave empty to disable filler audio.
-FILLER_AUDIO = os.getenv('FILLER_AUDIO', '')
+    load_dotenv(dotenv_path='.env.local')
+    return Settings.from_env()
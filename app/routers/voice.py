@@ -2,6 +2,7 @@ from fastapi import APIRouter, WebSocket, Request, Response
 from fastapi.responses import HTMLResponse
 from twilio.twiml.voice_response import VoiceResponse, Connect
 from app.services.voice_handler import VoiceEventHandler
+from app.services.vad_tuner import VAD_PARAMETER_NAMES
 
 router = APIRouter()
 
@@ -10,13 +11,20 @@ async def twiml_response(request: Request):
     """
     Twilio hits this endpoint when a call comes in.
     We respond with TwiML to connect the call to a Media Stream (WebSocket).
+    VAD tuning can be chosen per call via query parameters, e.g.
+    /twiml?vad=noisy&vad_adaptive=true&vad_silence_duration_ms=600
     """
     host = request.headers.get("host") or "localhost"
     
     response = VoiceResponse()
     response.say("Connected to Antigravity.")
     connect = Connect()
-    connect.stream(url=f"wss://{host}/websocket")
+    stream = connect.stream(url=f"wss://{host}/websocket")
+    # Forwarded to the WebSocket as customParameters on the "start" event
+    for name in VAD_PARAMETER_NAMES:
+        value = request.query_params.get(name)
+        if value:
+            stream.parameter(name=name, value=value)
     response.append(connect)
     
     return Response(content=str(response), media_type="application/xml")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, Form, Response
 from twilio.twiml.messaging_response import MessagingResponse
 # Import form the new services location (we will move chat_service.py next)
 from app.services.chat_service import get_chat_response
+from app.services.faq_index import stats as faq_stats
 
 router = APIRouter()
 
@@ -32,3 +33,8 @@ async def whatsapp_reply(
         msg.media(media_url)
     
     return Response(content=str(response), media_type="application/xml")
+
+@router.get("/whatsapp/faq-stats")
+async def faq_stats_report():
+    """Share of WhatsApp queries answered from the pre-computed FAQ index."""
+    return faq_stats.summary()
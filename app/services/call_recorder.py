@@ -0,0 +1,198 @@
+import base64
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.config import get_settings
+
+# Flush cadence of the background writer
+FLUSH_INTERVAL_SECONDS = 0.5
+# WAVE_FORMAT_MULAW, 8 kHz mono, 8 bits per sample (what Twilio Media Streams use)
+WAV_FORMAT_MULAW = 7
+SAMPLE_RATE = 8000
+# Approximate per-frame Python overhead (tuples, str header, deque slot) counted against the cap
+FRAME_OVERHEAD_BYTES = 200
+
+
+class FrameRing:
+    """
+    Bounded single-producer/single-consumer queue.
+    The event loop only appends and the writer thread only pops (both atomic on a deque),
+    and each side owns its own byte counter, so no lock is needed.
+    Frames are dropped and counted when the buffered size would exceed `max_bytes`;
+    callers pass the in-memory size of each frame (payload plus FRAME_OVERHEAD_BYTES).
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames = deque()
+        self._pushed_bytes = 0  # Written by the producer only
+        self._popped_bytes = 0  # Written by the consumer only
+        self.dropped = 0
+
+    def push(self, frame: tuple, size: int) -> bool:
+        if self._pushed_bytes - self._popped_bytes + size > self.max_bytes:
+            self.dropped += 1
+            return False
+        self._pushed_bytes += size
+        self._frames.append((frame, size))
+        return True
+
+    def drain(self) -> list:
+        frames = []
+        while True:
+            try:
+                frame, size = self._frames.popleft()
+            except IndexError:
+                break
+            self._popped_bytes += size
+            frames.append(frame)
+        return frames
+
+
+class _WavWriter:
+    """u-law WAV file written incrementally; sizes are patched into the header on close."""
+    def __init__(self, path: str):
+        self.file = open(path, "wb", buffering=64 * 1024)
+        self.data_bytes = 0
+        self._write_header()
+        self._data_start = self.file.tell()
+
+    def _write_header(self):
+        fmt = struct.pack("<HHIIHHH", WAV_FORMAT_MULAW, 1, SAMPLE_RATE, SAMPLE_RATE, 1, 8, 0)
+        riff_size = 4 + 8 + len(fmt) + 12 + 8 + self.data_bytes + self.data_bytes % 2
+        self.file.write(b"RIFF" + struct.pack("<I", riff_size) + b"WAVE")
+        self.file.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        # Non-PCM formats need a fact chunk with the sample count
+        self.file.write(b"fact" + struct.pack("<II", 4, self.data_bytes))
+        self.file.write(b"data" + struct.pack("<I", self.data_bytes))
+
+    def write(self, audio: bytes):
+        self.file.write(audio)
+        self.data_bytes += len(audio)
+
+    def drop_tail(self, n_bytes: int):
+        """Remove the last `n_bytes` of audio (possibly already flushed to disk)."""
+        n_bytes = min(n_bytes, self.data_bytes)
+        if n_bytes <= 0:
+            return
+        self.data_bytes -= n_bytes
+        self.file.seek(self._data_start + self.data_bytes)
+        self.file.truncate()
+
+    def close(self):
+        if self.data_bytes % 2:
+            self.file.write(b"\x00")  # RIFF chunks are word aligned
+        self.file.seek(0)
+        self._write_header()
+        self.file.close()
+
+
+class CallRecorder:
+    """
+    Opt-in per-call recorder (enabled by CALL_RECORDING_DIR).
+    The relay path only calls the tee/transcript methods, which append to a FrameRing;
+    a background thread decodes and writes the frames to disk in batches:
+        <dir>/<stream_sid>/inbound.wav, outbound.wav, transcript.jsonl
+    """
+    def __init__(self, directory: str, stream_sid: str, max_buffer_bytes: int):
+        self.path = os.path.join(directory, stream_sid)
+        self.ring = FrameRing(max_buffer_bytes)
+        self.writer_alive = True  # Cleared if the writer thread fails; tees then stop buffering
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"recorder-{stream_sid}", daemon=True)
+        self._thread.start()
+
+    # --- Relay path (event loop): append only ---
+
+    # Frames are buffered as the base64 strings, so that (not decoded audio) is what counts toward the cap
+
+    def tee_inbound(self, payload_b64: str):
+        if self.writer_alive:
+            self.ring.push(("inbound", payload_b64), len(payload_b64) + FRAME_OVERHEAD_BYTES)
+
+    def tee_outbound(self, payload_b64: str):
+        if self.writer_alive:
+            self.ring.push(("outbound", payload_b64), len(payload_b64) + FRAME_OVERHEAD_BYTES)
+
+    def drop_outbound(self, n_bytes: int):
+        """Twilio cleared its buffer on barge-in: drop the last `n_bytes` teed outbound, which were never played."""
+        if self.writer_alive and n_bytes > 0:
+            self.ring.push(("outbound_drop", n_bytes), FRAME_OVERHEAD_BYTES)
+
+    def add_transcript(self, role: str, text: str):
+        if self.writer_alive:
+            self.ring.push(("transcript", (time.time(), role, text)), len(text.encode("utf-8")) + FRAME_OVERHEAD_BYTES)
+
+    # --- Writer thread ---
+
+    def _run(self):
+        tracks = {}
+        transcript = None
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tracks["inbound"] = _WavWriter(os.path.join(self.path, "inbound.wav"))
+            tracks["outbound"] = _WavWriter(os.path.join(self.path, "outbound.wav"))
+            transcript = open(os.path.join(self.path, "transcript.jsonl"), "a", encoding="utf-8")
+            while True:
+                stopping = self._stop.wait(FLUSH_INTERVAL_SECONDS)
+                self._write_batch(self.ring.drain(), tracks, transcript)
+                if stopping:
+                    break
+        except Exception as e:
+            print(f"Call recorder failed, recording stopped ({self.path}): {e!r}")
+            self.writer_alive = False
+            self.ring.drain()  # Release what was buffered; nothing will write it
+        finally:
+            for track in tracks.values():
+                try:
+                    track.close()
+                except Exception as e:
+                    print(f"Call recorder could not finalize {track.file.name}: {e!r}")
+            if transcript is not None:
+                transcript.close()
+
+    def _write_batch(self, frames: list, tracks: dict, transcript):
+        if not frames:
+            return
+        # Group per track so each file gets one write per batch
+        audio = {"inbound": [], "outbound": []}
+
+        def flush_audio():
+            for kind, chunks in audio.items():
+                if chunks:
+                    tracks[kind].write(b"".join(chunks))
+                    chunks.clear()
+
+        for kind, payload in frames:
+            if kind == "transcript":
+                at, role, text = payload
+                transcript.write(json.dumps({"time": at, "role": role, "text": text}, ensure_ascii=False) + "\n")
+            elif kind == "outbound_drop":
+                # Applies to the outbound audio teed before it, which may be in this batch or on disk
+                flush_audio()
+                tracks["outbound"].drop_tail(payload)
+            else:
+                audio[kind].append(base64.b64decode(payload))
+        flush_audio()
+        transcript.flush()
+
+    def close(self) -> dict:
+        """Stop the writer after a final flush. Blocking; call it off the event loop."""
+        self._stop.set()
+        self._thread.join()
+        stats = {"path": self.path, "dropped_frames": self.ring.dropped, "failed": not self.writer_alive}
+        if self.writer_alive and self.ring.dropped:
+            print(f"Call recorder dropped {self.ring.dropped} frames (disk too slow): {self.path}")
+        return stats
+
+
+def create_recorder(stream_sid: str) -> Optional[CallRecorder]:
+    """Return a CallRecorder if recording is enabled in settings, else None."""
+    settings = get_settings()
+    if not settings.recording_dir:
+        return None
+    return CallRecorder(settings.recording_dir, stream_sid, settings.recording_buffer_bytes)
@@ -1,23 +1,68 @@
-import openai
 import httpx
 import json
 import base64
 import io
 import asyncio
-from app.config import OPENAI_API_KEY, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+import threading
+import time
+from app.config import get_settings
 from typing import Optional, Tuple
-from app.services.rag_client import RagClient
+from app.services.rag_client import get_rag_client, close_rag_client
+from app.services.faq_index import FaqIndex, FaqMatch, get_faq_index, embed, stats as faq_stats
 
-# Initialize Clients
-client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-rag_client = RagClient()
+# Budget for the FAQ embedding lookup. Only keyword hits are "instant"; an embedding
+# hit still costs an OpenAI round trip, and a slow or failing call must not delay RAG.
+FAQ_EMBEDDING_TIMEOUT_SECONDS = 0.3
+
+# Clients are created on first use (or by warm_up() in the app lifespan)
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """
+    Return the shared AsyncOpenAI client, importing openai on first use.
+    The first call blocks for the import (over a second cold), so async code uses openai_client().
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                import openai
+                _openai_client = openai.AsyncOpenAI(api_key=get_settings().openai_api_key)
+    return _openai_client
+
+async def openai_client():
+    """Async accessor: creates the client in a worker thread so the event loop (and live voice relays) never stall."""
+    if _openai_client is None:
+        return await asyncio.to_thread(get_openai_client)
+    return _openai_client
+
+async def warm_up():
+    """Create the clients and pre-login to RAG so the first message doesn't pay for it."""
+    try:
+        # Blocking work (openai import, index mmap) runs in threads, off the event loop
+        await openai_client()
+        await asyncio.to_thread(get_faq_index)
+        await get_rag_client().warm_up()
+        print("Chat service warmed up")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+async def shutdown():
+    """Close pooled connections held by the clients."""
+    global _openai_client
+    await close_rag_client()
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
 
 async def download_media(media_url: str) -> bytes:
     """Download media from Twilio URL (requires Basic Auth)."""
+    settings = get_settings()
     async with httpx.AsyncClient() as http_client:
         response = await http_client.get(
              media_url, 
-             auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+             auth=(settings.twilio_account_sid, settings.twilio_auth_token),
              follow_redirects=True
         )
         return response.content
@@ -30,6 +75,7 @@ async def analyze_image(media_url: str, media_type: str) -> str:
         base64_image = base64.b64encode(image_data).decode('utf-8')
         data_url = f"data:{media_type};base64,{base64_image}"
         
+        client = await openai_client()
         response = await client.chat.completions.create(
             model="gpt-4o",
             messages=[
@@ -53,6 +99,19 @@ async def analyze_image(media_url: str, media_type: str) -> str:
         print(f"Image analysis failed: {e}")
         return "[Error analyzing image]"
 
+async def match_faq_embedding(index: FaqIndex, query: str) -> Optional[FaqMatch]:
+    """Embed the query and look it up in the FAQ index. Failures and timeouts count as a miss."""
+    try:
+        client = (await openai_client()).with_options(timeout=FAQ_EMBEDDING_TIMEOUT_SECONDS, max_retries=0)
+        vectors = await asyncio.wait_for(embed(client, [query]), FAQ_EMBEDDING_TIMEOUT_SECONDS)
+        return index.match_vector(vectors[0])
+    except asyncio.TimeoutError:
+        print(f"FAQ embedding lookup timed out after {FAQ_EMBEDDING_TIMEOUT_SECONDS * 1000:.0f} ms")
+        return None
+    except Exception as e:
+        print(f"FAQ embedding lookup failed: {e}")
+        return None
+
 async def get_chat_response(
     message_body: str, 
     sender_number: str, 
@@ -64,7 +123,9 @@ async def get_chat_response(
     Flow: Input -> [Whisper/Vision] -> Text -> RAG API -> Output
     Returns: (text_response, optional_media_url)
     """
-    
+    # Every message counts toward the FAQ index's share of traffic, hit or not
+    faq_stats.record_query()
+
     final_query_parts = []
     
     # 1. Text Input
@@ -80,6 +141,7 @@ async def get_chat_response(
             audio_file = io.BytesIO(audio_bytes)
             audio_file.name = f"voice_note.{ext}" 
             
+            client = await openai_client()
             transcription = await client.audio.transcriptions.create(
                 model="whisper-1",
                 file=audio_file
@@ -105,9 +167,34 @@ async def get_chat_response(
     full_query = "\n".join(final_query_parts)
     print(f"Final RAG Query: {full_query}")
 
-    # 4. Direct RAG Query
+    # 4. Pre-computed FAQ answers (not for images, their context is unique)
+    is_image = bool(media_type and media_type.startswith('image/'))
+    faq_index = None if is_image else get_faq_index()
+    rag_task = None
     try:
-        rag_answer = await rag_client.query(full_query)
+        if faq_index:
+            started = time.perf_counter()
+            match = faq_index.match_keywords(full_query)
+            if match is None:
+                # Race the real RAG query against the embedding lookup: a miss adds no
+                # latency, and if RAG answers first its answer is used
+                rag_task = asyncio.create_task(get_rag_client().query(full_query))
+                embedding_task = asyncio.create_task(match_faq_embedding(faq_index, full_query))
+                done, _ = await asyncio.wait({rag_task, embedding_task}, return_when=asyncio.FIRST_COMPLETED)
+                if embedding_task in done:
+                    match = embedding_task.result()
+                else:
+                    embedding_task.cancel()
+            if match:
+                faq_stats.record_hit(match)
+                if rag_task:
+                    rag_task.cancel()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(f"FAQ {match.method} hit ({match.score:.2f}, {elapsed_ms:.1f} ms): {match.question}")
+                return match.answer, None
+
+        # 5. Direct RAG Query
+        rag_answer = await (rag_task or get_rag_client().query(full_query))
         # Ensure result is string
         return str(rag_answer), None
     except Exception as e:
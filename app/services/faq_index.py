@@ -0,0 +1,239 @@
+import glob
+import json
+import mmap
+import os
+import re
+import time
+import uuid
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from app.config import get_settings
+
+# Files written by build_faq_index.py. Each build writes a new embeddings file
+# (named in entries.json) because a memory-mapped file can't be replaced on Windows.
+ENTRIES_FILE = "entries.json"
+EMBEDDINGS_PATTERN = "embeddings-{build_id}.f32"  # Row-major native float32, one unit-length row per entry
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 256  # Shortened embeddings keep the index small and scoring fast
+
+# Keyword hits need the same keyword set as an indexed question (one added or missing
+# word, e.g. "renewal", can change the answer) and at least this many keywords
+MIN_KEYWORDS = 2
+# Only answer from embeddings above this cosine similarity. Not calibrated on real
+# query pairs, so a hit must also clearly beat the second-best entry: near-miss
+# questions ("issuance fees" vs "renewal fees") score close to several entries.
+MIN_EMBEDDING_SCORE = 0.92
+MIN_EMBEDDING_MARGIN = 0.05
+
+# How often (seconds) the server checks whether the index was rebuilt on disk
+RELOAD_CHECK_SECONDS = 30
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "i", "you", "we", "to", "of", "for", "in",
+    "on", "what", "how", "can", "my", "me", "please", "and", "or", "it", "be",
+    "في", "من", "على", "الى", "الي", "عن", "ما", "ماذا", "هل", "كيف", "هو", "هي", "انا", "و", "او", "ان",
+}
+
+_ARABIC_DIACRITICS = re.compile("[\u064B-\u0652\u0640]")  # Tashkeel and tatweel
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip Arabic diacritics/tatweel and unify common letter variants."""
+    text = _ARABIC_DIACRITICS.sub("", text.lower())
+    text = re.sub("[\u0623\u0625\u0622]", "\u0627", text).replace("\u0649", "\u064A").replace("\u0629", "\u0647")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def keywords(text: str) -> Set[str]:
+    return {token for token in normalize(text).split() if token not in STOPWORDS}
+
+
+@dataclass
+class FaqMatch:
+    question: str
+    answer: str
+    score: float
+    method: str  # "keyword" or "embedding"
+
+
+class FaqIndex:
+    """
+    Read-only view over an index directory built by build_faq_index.py.
+    The embedding matrix is memory-mapped rather than read into Python objects.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        entries_path = os.path.join(directory, ENTRIES_FILE)
+        self.mtime = os.stat(entries_path).st_mtime
+        with open(entries_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dimensions = meta["dimensions"]
+        self.entries: List[dict] = meta["entries"]
+
+        self._by_question = {normalize(e["question"]): i for i, e in enumerate(self.entries)}
+        self._by_keywords: Dict[frozenset, int] = {}
+        for i, entry in enumerate(self.entries):
+            words = keywords(entry["question"])
+            if len(words) >= MIN_KEYWORDS:
+                self._by_keywords.setdefault(frozenset(words), i)
+
+        self.embeddings_file = meta.get("embeddings_file")
+        self._vectors = None
+        if self.entries:
+            with open(os.path.join(directory, self.embeddings_file), "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._vectors = memoryview(self._mmap).cast("f")
+            if len(self._vectors) != len(self.entries) * self.dimensions:
+                raise ValueError(f"{self.embeddings_file} does not match {ENTRIES_FILE}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _match(self, i: int, score: float, method: str) -> FaqMatch:
+        entry = self.entries[i]
+        return FaqMatch(entry["question"], entry["answer"], score, method)
+
+    def match_keywords(self, query: str) -> Optional[FaqMatch]:
+        """
+        Exact normalized question, else a question with exactly the same keywords
+        (ignoring order, stopwords and diacritics). Anything looser goes to embeddings/RAG.
+        """
+        exact = self._by_question.get(normalize(query))
+        if exact is None:
+            words = keywords(query)
+            if len(words) >= MIN_KEYWORDS:
+                exact = self._by_keywords.get(frozenset(words))
+        if exact is not None:
+            return self._match(exact, 1.0, "keyword")
+        return None
+
+    def match_vector(self, vector: List[float]) -> Optional[FaqMatch]:
+        """
+        Nearest entry by cosine similarity (rows and `vector` are unit length), if it is
+        above MIN_EMBEDDING_SCORE and ahead of the runner-up by MIN_EMBEDDING_MARGIN.
+        """
+        if self._vectors is None:
+            return None
+        dims = self.dimensions
+        best, best_score, second_score = None, 0.0, 0.0
+        for i in range(len(self.entries)):
+            row = self._vectors[i * dims:(i + 1) * dims]
+            score = sum(a * b for a, b in zip(row, vector))
+            if score > best_score:
+                best, best_score, second_score = i, score, best_score
+            elif score > second_score:
+                second_score = score
+        if best is None or best_score < MIN_EMBEDDING_SCORE:
+            return None
+        if best_score - second_score < MIN_EMBEDDING_MARGIN:
+            print(f"FAQ embedding match ambiguous ({best_score:.2f} vs {second_score:.2f}), using RAG")
+            return None
+        return self._match(best, best_score, "embedding")
+
+    def vector(self, i: int) -> List[float]:
+        """Stored embedding of entry `i` (used by incremental rebuilds)."""
+        return list(self._vectors[i * self.dimensions:(i + 1) * self.dimensions])
+
+
+def write_index(directory: str, entries: List[dict], vectors: List[List[float]]):
+    """
+    Write a new build: a fresh embeddings file first, then entries.json pointing at it
+    (its mtime tells running servers to reload). Older embeddings files are removed
+    when possible; one still mapped by a server (Windows) is left for the next build.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = array("f")
+    for vector in vectors:
+        matrix.extend(vector)
+
+    embeddings_file = EMBEDDINGS_PATTERN.format(build_id=f"{int(time.time())}-{uuid.uuid4().hex[:8]}")
+    with open(os.path.join(directory, embeddings_file), "wb") as f:
+        matrix.tofile(f)
+
+    entries_tmp = os.path.join(directory, ENTRIES_FILE + ".tmp")
+    with open(entries_tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "model": EMBEDDING_MODEL,
+            "dimensions": EMBEDDING_DIMENSIONS,
+            "built_at": time.time(),
+            "embeddings_file": embeddings_file,
+            "entries": entries,
+        }, f, ensure_ascii=False)
+    os.replace(entries_tmp, os.path.join(directory, ENTRIES_FILE))
+
+    for old in glob.glob(os.path.join(directory, EMBEDDINGS_PATTERN.format(build_id="*"))):
+        if os.path.basename(old) != embeddings_file:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+async def embed(client, texts: List[str]) -> List[List[float]]:
+    """Unit-length embeddings for `texts` (one API call)."""
+    response = await client.embeddings.create(
+        model=EMBEDDING_MODEL, input=texts, dimensions=EMBEDDING_DIMENSIONS
+    )
+    vectors = []
+    for item in response.data:
+        norm = sum(v * v for v in item.embedding) ** 0.5 or 1.0
+        vectors.append([v / norm for v in item.embedding])
+    return vectors
+
+
+class FaqStats:
+    """Share of all WhatsApp traffic served from the index."""
+    def __init__(self):
+        self.queries = 0
+        self.keyword_hits = 0
+        self.embedding_hits = 0
+
+    def record_query(self):
+        """Count every incoming message, whether or not the index could be used for it."""
+        self.queries += 1
+
+    def record_hit(self, match: FaqMatch):
+        if match.method == "keyword":
+            self.keyword_hits += 1
+        else:
+            self.embedding_hits += 1
+
+    def summary(self) -> dict:
+        served = self.keyword_hits + self.embedding_hits
+        return {
+            "queries": self.queries,
+            "served_from_index": served,
+            "keyword_hits": self.keyword_hits,
+            "embedding_hits": self.embedding_hits,
+            "served_share": round(served / self.queries, 3) if self.queries else 0.0,
+        }
+
+
+stats = FaqStats()
+_index: Optional[FaqIndex] = None
+_last_reload_check = None
+
+
+def get_faq_index() -> Optional[FaqIndex]:
+    """Return the loaded index (None if none was built), picking up rebuilds on disk."""
+    global _index, _last_reload_check
+    now = time.monotonic()
+    if _last_reload_check is not None and now - _last_reload_check < RELOAD_CHECK_SECONDS:
+        return _index
+    _last_reload_check = now
+
+    directory = get_settings().faq_index_dir
+    try:
+        mtime = os.stat(os.path.join(directory, ENTRIES_FILE)).st_mtime
+    except OSError:
+        return _index
+    if _index is None or mtime != _index.mtime:
+        try:
+            _index = FaqIndex(directory)
+            print(f"FAQ index loaded: {len(_index)} entries from {directory}")
+        except Exception as e:
+            print(f"FAQ index load failed: {e}")
+    return _index
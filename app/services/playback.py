@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from typing import Optional
+
+# g711 u-law at 8 kHz: one byte per sample, 8 bytes per millisecond
+ULAW_BYTES_PER_MS = 8
+
+
+def ulaw_duration_ms(payload_b64: str) -> float:
+    """Duration of a base64 u-law payload, computed without decoding it."""
+    raw_bytes = len(payload_b64) * 3 // 4 - payload_b64[-2:].count("=")
+    return raw_bytes / ULAW_BYTES_PER_MS
+
+
+class PlaybackTracker:
+    """
+    Follows how much outbound audio Twilio has actually played.
+    A `mark` is sent after every chunk; Twilio echoes it back once the audio
+    before it has been played, which gives us the caller's playback position.
+    """
+    def __init__(self):
+        self._pending = deque()  # (mark_name, item_id, item_end_ms, duration_ms) in send order
+        self._mark_count = 0
+        self._playhead_at = None  # perf_counter when the playhead position was last known
+
+        self.item_id = None   # Assistant item whose audio is being played
+        self.sent_ms = 0.0    # Audio of item_id sent to Twilio
+        self.played_ms = 0.0  # Audio of item_id confirmed played by a mark
+
+    @property
+    def is_playing(self) -> bool:
+        """True while Twilio still has unconfirmed audio queued."""
+        return bool(self._pending)
+
+    def _next_mark(self, item_id: Optional[str], end_ms: Optional[float], duration_ms: float) -> str:
+        if not self._pending:
+            # Nothing queued, so this chunk starts playing right away
+            self._playhead_at = time.perf_counter()
+        self._mark_count += 1
+        name = f"chunk-{self._mark_count}"
+        self._pending.append((name, item_id, end_ms, duration_ms))
+        return name
+
+    def chunk_sent(self, item_id: str, payload_b64: str) -> str:
+        """Register an outbound assistant audio chunk. Returns the mark name to send after it."""
+        if item_id != self.item_id:
+            self.item_id = item_id
+            self.sent_ms = 0.0
+            self.played_ms = 0.0
+        duration_ms = ulaw_duration_ms(payload_b64)
+        self.sent_ms += duration_ms
+        return self._next_mark(item_id, self.sent_ms, duration_ms)
+
+    def filler_sent(self, payload_b64: str = "") -> str:
+        """Register audio that isn't part of any assistant item (e.g. filler)."""
+        return self._next_mark(None, None, ulaw_duration_ms(payload_b64) if payload_b64 else 0.0)
+
+    def mark_received(self, name: str):
+        """Twilio played everything up to and including mark `name`."""
+        if not any(pending[0] == name for pending in self._pending):
+            return
+        while self._pending:
+            mark_name, item_id, end_ms, _ = self._pending.popleft()
+            if item_id is not None and item_id == self.item_id:
+                self.played_ms = end_ms
+            if mark_name == name:
+                break
+        self._playhead_at = time.perf_counter()
+
+    def audio_end_ms(self) -> int:
+        """Best estimate of how much of the current item the caller has heard."""
+        played = self.played_ms
+        if self._pending and self._pending[0][1] == self.item_id and self._playhead_at is not None:
+            # The next chunk of this item is mid-playback: add the time since the last confirmation
+            elapsed_ms = (time.perf_counter() - self._playhead_at) * 1000
+            played = min(played + elapsed_ms, self._pending[0][2])
+        return int(min(played, self.sent_ms))
+
+    def truncation_point(self) -> Optional[int]:
+        """
+        Where to truncate the current item on barge-in, or None when there is nothing
+        unheard to drop (no item, or it already played in full and only filler is queued).
+        """
+        if self.item_id is None:
+            return None
+        audio_end_ms = self.audio_end_ms()
+        if audio_end_ms >= int(self.sent_ms):
+            return None
+        return audio_end_ms
+
+    def unplayed_ms(self) -> float:
+        """All queued audio (any item or filler) the caller hasn't heard yet; a clear discards it."""
+        unplayed = sum(pending[3] for pending in self._pending)
+        if self._pending and self._playhead_at is not None:
+            elapsed_ms = (time.perf_counter() - self._playhead_at) * 1000
+            unplayed -= min(elapsed_ms, self._pending[0][3])
+        return unplayed
+
+    def reset(self):
+        """Forget queued audio (after Twilio's buffer has been cleared)."""
+        self._pending.clear()
+        self._playhead_at = None
+        self.item_id = None
+        self.sent_ms = 0.0
+        self.played_ms = 0.0
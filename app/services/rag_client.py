@@ -1,40 +1,71 @@
-import os
 import httpx
 import json
+from typing import Optional
 
-from app.config import RAG_API_BASE_URL, RAG_EMAIL, RAG_PASSWORD, RAG_SESSION_ID
+from app.config import get_settings
+
+# Messages returned in place of an answer when the RAG API call fails
+REJECTED_FORMAT_ANSWER = "I found some info but the system rejected the format."
+UNPARSEABLE_ANSWER_PREFIX = "Received info but couldn't parse: "
+UNAVAILABLE_ANSWER = "Sorry, I couldn't access the knowledge base at this moment."
+
+def is_fallback_answer(answer: Optional[str]) -> bool:
+    """True if `answer` is one of the failure messages above rather than real content."""
+    return (not answer
+            or answer in (REJECTED_FORMAT_ANSWER, UNAVAILABLE_ANSWER)
+            or answer.startswith(UNPARSEABLE_ANSWER_PREFIX))
 
 class RagClient:
     def __init__(self):
-        self.base_url = RAG_API_BASE_URL
+        self.settings = get_settings()
+        self.base_url = self.settings.rag_api_base_url
         self.token = None
+        self._http = None  # Shared connection pool, created on first use
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Keep one AsyncClient so TLS connections are reused across queries."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient()
+        return self._http
+
+    async def aclose(self):
+        """Close the shared connection pool."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def warm_up(self):
+        """Log in ahead of the first query (also opens a pooled connection)."""
+        if not self.token:
+            await self.login()
 
     async def login(self):
         """Authenticate and get a JWT token."""
         url = f"{self.base_url}/auth/login"
         payload = {
-            "email": RAG_EMAIL,
-            "password": RAG_PASSWORD
+            "email": self.settings.rag_email,
+            "password": self.settings.rag_password
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                # Access token might be directly in data like "token" or "access_token"
-                # Looking at standard implementations, let's assume "data"->"token" or just "token"
-                # We will debug this if it fails, but standard is usually data['data']['token'] or data['token']
-                # Let's start with a safe check
-                if "data" in data and "token" in data["data"]:
-                     self.token = data["data"]["token"]
-                elif "token" in data:
-                     self.token = data["token"]
-                elif "access_token" in data:
-                     self.token = data["access_token"]
-                else:
-                     print(f"Login Response unexpected format: {data}")
-            except Exception as e:
-                print(f"RAG Login Failed: {e}")
+        client = self.http
+        try:
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+            data = response.json()
+            # Access token might be directly in data like "token" or "access_token"
+            # Looking at standard implementations, let's assume "data"->"token" or just "token"
+            # We will debug this if it fails, but standard is usually data['data']['token'] or data['token']
+            # Let's start with a safe check
+            if "data" in data and "token" in data["data"]:
+                 self.token = data["data"]["token"]
+            elif "token" in data:
+                 self.token = data["token"]
+            elif "access_token" in data:
+                 self.token = data["access_token"]
+            else:
+                 print(f"Login Response unexpected format: {data}")
+        except Exception as e:
+            print(f"RAG Login Failed: {e}")
 
     async def query(self, message: str) -> str:
         """Send a message to the RAG chat API."""
@@ -47,7 +78,7 @@ class RagClient:
         # Schema requires multipart/form-data for 'message' and 'session_id'
         # based on ChatMessageCreateModel schema in OpenAPI
         data = {
-            "session_id": RAG_SESSION_ID,
+            "session_id": self.settings.rag_session_id,
             "message": message,
             "styled_answer": "false" # Optional, purely text preference
         }
@@ -56,72 +87,89 @@ class RagClient:
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
 
-        async with httpx.AsyncClient() as client:
-            try:
-                # httpx handles multipart/form-data when using 'data' param (not json)
+        client = self.http
+        try:
+            # httpx handles multipart/form-data when using 'data' param (not json)
+            response = await client.post(url, data=data, headers=headers)
+            
+            if response.status_code == 401:
+                print("Token expired, refreshing...")
+                await self.login()
+                headers["Authorization"] = f"Bearer {self.token}"
                 response = await client.post(url, data=data, headers=headers)
-                
-                if response.status_code == 401:
-                    print("Token expired, refreshing...")
-                    await self.login()
-                    headers["Authorization"] = f"Bearer {self.token}"
-                    response = await client.post(url, data=data, headers=headers)
-
-                if response.status_code == 422:
-                    print(f"Validation Error: {response.text}")
-                    return "I found some info but the system rejected the format."
-
-                # The API appears to return newline-delimited JSON (NDJSON) or a stream.
-                # 'Extra data' error means multiple JSON objects are in the response.
-                # We will handle this by splitting lines and looking for the answer.
-                response_text = response.text
-                print(f"RAG Raw Response: {response_text[:200]}...") # Log start of response for debug
-                
-                final_answer = ""
-                accumulated_chunks = []
-                
-                # Try to parse each line as a separate JSON object
-                for line in response_text.strip().split('\n'):
-                    if not line.strip():
-                        continue
-                    try:
-                        data = json.loads(line)
-                        
-                        # Debug log for each line type (optional, keep it concise)
-                        # print(f"Processing line type: {data.get('type')}") 
 
-                        # Check logic for various formats:
+            if response.status_code == 422:
+                print(f"Validation Error: {response.text}")
+                return REJECTED_FORMAT_ANSWER
 
-                        # 1. Top-level 'answer' key (Standard JSON or final event)
-                        if "answer" in data and isinstance(data["answer"], str):
-                            final_answer = data["answer"]
-                        
-                        # 2. Nested 'answer' inside 'data' dict (e.g. {"type": "end", "data": {"answer": "..."}})
-                        elif "data" in data and isinstance(data["data"], dict):
-                            if "answer" in data["data"] and isinstance(data["data"]["answer"], str):
-                                final_answer = data["data"]["answer"]
-                        
-                        # 3. Streaming string content in 'data' (e.g. {"type": "chunk", "data": "Hello"})
-                        elif "data" in data and isinstance(data["data"], str):
-                             accumulated_chunks.append(data["data"])
-                            
-                    except json.JSONDecodeError:
-                        continue
-                
-                # If we found an explicit 'answer' field, use it (it likely overrides partial chunks)
-                if final_answer:
-                    return final_answer
-                
-                # Otherwise, join any accumulated string chunks
-                if accumulated_chunks:
-                    return "".join(accumulated_chunks)
-                
-                # Fallback: if single JSON parsing failed above (unlikely if loop worked), try whole body
+            # The API appears to return newline-delimited JSON (NDJSON) or a stream.
+            # 'Extra data' error means multiple JSON objects are in the response.
+            # We will handle this by splitting lines and looking for the answer.
+            response_text = response.text
+            print(f"RAG Raw Response: {response_text[:200]}...") # Log start of response for debug
+            
+            final_answer = ""
+            accumulated_chunks = []
+            
+            # Try to parse each line as a separate JSON object
+            for line in response_text.strip().split('\n'):
+                if not line.strip():
+                    continue
                 try:
-                    return response.json().get("answer")
-                except:
-                    return f"Received info but couldn't parse: {response_text[:100]}"
-                
-            except Exception as e:
-                print(f"RAG Query Error: {e}")
-                return "Sorry, I couldn't access the knowledge base at this moment."
+                    data = json.loads(line)
+                    
+                    # Debug log for each line type (optional, keep it concise)
+                    # print(f"Processing line type: {data.get('type')}") 
+
+                    # Check logic for various formats:
+
+                    # 1. Top-level 'answer' key (Standard JSON or final event)
+                    if "answer" in data and isinstance(data["answer"], str):
+                        final_answer = data["answer"]
+                    
+                    # 2. Nested 'answer' inside 'data' dict (e.g. {"type": "end", "data": {"answer": "..."}})
+                    elif "data" in data and isinstance(data["data"], dict):
+                        if "answer" in data["data"] and isinstance(data["data"]["answer"], str):
+                            final_answer = data["data"]["answer"]
+                    
+                    # 3. Streaming string content in 'data' (e.g. {"type": "chunk", "data": "Hello"})
+                    elif "data" in data and isinstance(data["data"], str):
+                         accumulated_chunks.append(data["data"])
+                        
+                except json.JSONDecodeError:
+                    continue
+            
+            # If we found an explicit 'answer' field, use it (it likely overrides partial chunks)
+            if final_answer:
+                return final_answer
+            
+            # Otherwise, join any accumulated string chunks
+            if accumulated_chunks:
+                return "".join(accumulated_chunks)
+            
+            # Fallback: if single JSON parsing failed above (unlikely if loop worked), try whole body
+            try:
+                return response.json().get("answer")
+            except:
+                return f"{UNPARSEABLE_ANSWER_PREFIX}{response_text[:100]}"
+            
+        except Exception as e:
+            print(f"RAG Query Error: {e}")
+            return UNAVAILABLE_ANSWER
+
+
+_rag_client: Optional[RagClient] = None
+
+def get_rag_client() -> RagClient:
+    """Return the process-wide RagClient, creating it on first use."""
+    global _rag_client
+    if _rag_client is None:
+        _rag_client = RagClient()
+    return _rag_client
+
+async def close_rag_client():
+    """Close the process-wide RagClient if one was created."""
+    global _rag_client
+    if _rag_client is not None:
+        await _rag_client.aclose()
+        _rag_client = None
@@ -0,0 +1,214 @@
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import List, Optional, Tuple
+
+from app.config import VAD_PROFILES, DEFAULT_VAD_PROFILE
+
+# Stream <Parameter> names accepted from /twiml
+VAD_PARAMETER_NAMES = (
+    "vad", "vad_adaptive", "vad_threshold",
+    "vad_prefix_padding_ms", "vad_silence_duration_ms",
+)
+
+# Bounds for both per-call overrides and adaptive tuning, with adaptive step sizes
+MIN_THRESHOLD, MAX_THRESHOLD, THRESHOLD_STEP = 0.3, 0.9, 0.05
+MIN_SILENCE_MS, MAX_SILENCE_MS, SILENCE_STEP_MS = 300, 1000, 50
+MIN_PADDING_MS, MAX_PADDING_MS, PADDING_STEP_MS = 200, 600, 50
+
+# Speech shorter than this that cut off the assistant is counted as a false interrupt
+FALSE_INTERRUPT_MAX_MS = 400
+# A genuine barge-in this soon after the reply started means the caller's turn was ended too early
+CUT_OFF_WINDOW_MS = 1500
+# Re-evaluate after this many turns, and aim for this latency from the caller's
+# last word to the first reply audio (turns that call a tool are left out)
+ADAPT_EVERY_TURNS = 3
+TARGET_TURN_LATENCY_MS = 900
+# Only shorten the silence window when it is at least this share of the latency
+MIN_SILENCE_SHARE = 0.5
+
+
+def _clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+@dataclass(frozen=True)
+class VadSettings:
+    threshold: float
+    prefix_padding_ms: int
+    silence_duration_ms: int
+
+    @classmethod
+    def from_parameters(cls, params: dict) -> "VadSettings":
+        """Build settings from a named profile plus optional per-value overrides."""
+        profile = VAD_PROFILES.get(params.get("vad") or DEFAULT_VAD_PROFILE)
+        if profile is None:
+            print(f"Unknown VAD profile {params.get('vad')!r}, using {DEFAULT_VAD_PROFILE!r}")
+            profile = VAD_PROFILES[DEFAULT_VAD_PROFILE]
+        settings = cls(**profile)
+
+        # Parse each override on its own so one bad value doesn't discard the others
+        overrides = (
+            ("vad_threshold", "threshold", float, MIN_THRESHOLD, MAX_THRESHOLD),
+            ("vad_prefix_padding_ms", "prefix_padding_ms", int, MIN_PADDING_MS, MAX_PADDING_MS),
+            ("vad_silence_duration_ms", "silence_duration_ms", int, MIN_SILENCE_MS, MAX_SILENCE_MS),
+        )
+        for param, field, parse, low, high in overrides:
+            if not params.get(param):
+                continue
+            try:
+                value = parse(params[param])
+            except ValueError:
+                value = None
+            if value is None or not math.isfinite(value):
+                print(f"Ignoring invalid VAD override {param}={params[param]!r}")
+                continue
+            settings = replace(settings, **{field: _clamp(value, low, high)})
+        return settings
+
+    def to_turn_detection(self) -> dict:
+        """Realtime API `turn_detection` block."""
+        return {
+            "type": "server_vad",
+            "threshold": self.threshold,
+            "prefix_padding_ms": self.prefix_padding_ms,
+            "silence_duration_ms": self.silence_duration_ms,
+        }
+
+
+class TurnTracker:
+    """
+    Per-call turn-taking metrics (barge-ins, false interrupts, turn latency),
+    optionally nudging the VAD settings when `adaptive` is on.
+
+    Turn latency runs from when the caller actually stopped talking (speech_stopped
+    minus the silence window that VAD waited out) to the first reply audio.
+    """
+    def __init__(self, settings: VadSettings, adaptive: bool = False):
+        self.settings = settings
+        self.adaptive = adaptive
+        self.turns = 0
+        self.barge_ins = 0
+        self.false_interrupts = 0
+        self.cut_offs = 0
+        self.turn_latencies_ms: List[float] = []
+        self.tool_turn_latencies_ms: List[float] = []
+
+        self._speech_start_audio_ms = None
+        self._interrupted_assistant = False
+        self._maybe_cut_off = False
+        self._speech_stopped_at = None
+        self._turn_silence_ms = 0
+        self._turn_used_tool = False
+        self._response_audio_at = None
+
+        self._window_turns = 0
+        self._window_barge_ins = 0
+        self._window_false_interrupts = 0
+        self._window_cut_offs = 0
+        self._window_latencies: List[Tuple[float, int]] = []  # (latency_ms, silence_ms)
+
+    def speech_started(self, audio_start_ms: Optional[int], assistant_speaking: bool):
+        self._speech_start_audio_ms = audio_start_ms
+        self._interrupted_assistant = assistant_speaking
+        self._maybe_cut_off = (
+            assistant_speaking and self._response_audio_at is not None
+            and (time.perf_counter() - self._response_audio_at) * 1000 < CUT_OFF_WINDOW_MS
+        )
+        self._speech_stopped_at = None
+        if assistant_speaking:
+            self.barge_ins += 1
+            self._window_barge_ins += 1
+
+    def speech_stopped(self, audio_end_ms: Optional[int]) -> Optional[VadSettings]:
+        """Record the end of a user turn. Returns new settings if they were adapted."""
+        self._speech_stopped_at = time.perf_counter()
+        self._turn_silence_ms = self.settings.silence_duration_ms
+        self._turn_used_tool = False
+        self.turns += 1
+        self._window_turns += 1
+
+        false_interrupt = (
+            self._interrupted_assistant
+            and audio_end_ms is not None and self._speech_start_audio_ms is not None
+            and audio_end_ms - self._speech_start_audio_ms < FALSE_INTERRUPT_MAX_MS
+        )
+        if false_interrupt:
+            self.false_interrupts += 1
+            self._window_false_interrupts += 1
+        elif self._maybe_cut_off:
+            self.cut_offs += 1
+            self._window_cut_offs += 1
+
+        if self.adaptive and self._window_turns >= ADAPT_EVERY_TURNS:
+            return self._adapt()
+        return None
+
+    def tool_call_started(self):
+        """The reply to the current turn waits on a tool (RAG), so its latency says nothing about VAD."""
+        self._turn_used_tool = True
+
+    def response_audio_started(self):
+        """Called on the first audio delta of a response."""
+        self._response_audio_at = time.perf_counter()
+        if self._speech_stopped_at is None:
+            return
+        latency_ms = (self._response_audio_at - self._speech_stopped_at) * 1000 + self._turn_silence_ms
+        self._speech_stopped_at = None
+        if self._turn_used_tool:
+            self.tool_turn_latencies_ms.append(latency_ms)
+            print(f"Turn latency (tool call): {latency_ms:.0f} ms")
+        else:
+            self.turn_latencies_ms.append(latency_ms)
+            self._window_latencies.append((latency_ms, self._turn_silence_ms))
+            print(f"Turn latency: {latency_ms:.0f} ms")
+
+    def _adapt(self) -> Optional[VadSettings]:
+        s = self.settings
+        false_rate = self._window_false_interrupts / self._window_barge_ins if self._window_barge_ins else 0.0
+        latencies = self._window_latencies
+        avg_latency = sum(l for l, _ in latencies) / len(latencies) if latencies else 0.0
+        silence_share = sum(silence for _, silence in latencies) / sum(l for l, _ in latencies) if latencies else 0.0
+
+        if false_rate > 0.3:
+            # Noise is cutting the assistant off: be harder to trigger, and wait longer before replying
+            s = replace(
+                s,
+                threshold=min(s.threshold + THRESHOLD_STEP, MAX_THRESHOLD),
+                prefix_padding_ms=min(s.prefix_padding_ms + PADDING_STEP_MS, MAX_PADDING_MS),
+                silence_duration_ms=min(s.silence_duration_ms + SILENCE_STEP_MS, MAX_SILENCE_MS),
+            )
+        elif self._window_cut_offs:
+            # Callers kept talking right after we answered: their turns were ended too early
+            s = replace(s, silence_duration_ms=min(s.silence_duration_ms + SILENCE_STEP_MS, MAX_SILENCE_MS))
+        elif avg_latency > TARGET_TURN_LATENCY_MS and silence_share >= MIN_SILENCE_SHARE:
+            # Replies are slow and the VAD silence window is most of the wait: end turns sooner
+            s = replace(s, silence_duration_ms=max(s.silence_duration_ms - SILENCE_STEP_MS, MIN_SILENCE_MS))
+        elif self._window_barge_ins and not self._window_false_interrupts:
+            # Every barge-in was genuine: let the caller interrupt more easily
+            s = replace(s, threshold=max(s.threshold - THRESHOLD_STEP, MIN_THRESHOLD))
+
+        self._window_turns = 0
+        self._window_barge_ins = 0
+        self._window_false_interrupts = 0
+        self._window_cut_offs = 0
+        self._window_latencies = []
+
+        if s == self.settings:
+            return None
+        self.settings = s
+        return s
+
+    def summary(self) -> dict:
+        latencies = sorted(self.turn_latencies_ms)
+        return {
+            "turns": self.turns,
+            "barge_ins": self.barge_ins,
+            "false_interrupts": self.false_interrupts,
+            "cut_offs": self.cut_offs,
+            "avg_turn_latency_ms": round(sum(latencies) / len(latencies)) if latencies else None,
+            "p90_turn_latency_ms": round(latencies[min(int(len(latencies) * 0.9), len(latencies) - 1)]) if latencies else None,
+            "turn_latencies_ms": [round(l) for l in self.turn_latencies_ms],
+            "tool_turn_latencies_ms": [round(l) for l in self.tool_turn_latencies_ms],
+            "final_vad": self.settings.to_turn_detection(),
+        }
@@ -1,22 +1,32 @@
 import asyncio
 import json
-import websockets
 from fastapi import WebSocket
-from app.config import OPENAI_API_KEY, VOICE_SYSTEM_MESSAGE, VOICE, LOG_EVENT_TYPES
+from app.config import get_settings, VOICE_SYSTEM_MESSAGE, VOICE, LOG_EVENT_TYPES
+from app.services.vad_tuner import VadSettings, TurnTracker
+from app.services.playback import PlaybackTracker, ULAW_BYTES_PER_MS
+from app.services.call_recorder import create_recorder
 
 class VoiceEventHandler:
     def __init__(self, websocket: WebSocket):
         self.websocket = websocket
         self.stream_sid = None
         self.openai_ws = None
-        self.last_assistant_item_id = None  # Track current response for cancellation
+        self.active_response_id = None  # Response currently being generated (for cancellation)
+        self.cancelled_response_id = None  # Late audio deltas from this response are dropped
+        self.playback = PlaybackTracker()  # What Twilio has actually played, via marks
+        self.recorder = None  # CallRecorder when CALL_RECORDING_DIR is set
+        # Default VAD profile until Twilio's "start" event brings the per-call parameters
+        self.turns = TurnTracker(VadSettings.from_parameters({}))
 
     async def start(self):
+        # Imported here so loading the app doesn't pay for websockets until a call arrives
+        import websockets
+
         try:
             # Connection to OpenAI Realtime API
             url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview"
             headers = {
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Authorization": f"Bearer {get_settings().openai_api_key}",
                 "OpenAI-Beta": "realtime=v1"
             }
 
@@ -34,13 +44,19 @@ class VoiceEventHandler:
             print("OpenAI Connection Closed")
         except Exception as e:
             print(f"Error in VoiceEventHandler: {e}")
+        finally:
+            print(f"Call turn stats ({self.stream_sid}): {json.dumps(self.turns.summary())}")
+            if self.recorder:
+                # Final flush happens on the writer thread; don't block the event loop on it
+                stats = await asyncio.to_thread(self.recorder.close)
+                print(f"Call recording saved: {stats}")
 
     async def initialize_session(self):
         """Send initial session update to OpenAI."""
         session_update = {
             "type": "session.update",
             "session": {
-                "turn_detection": {"type": "server_vad"},
+                "turn_detection": self.turns.settings.to_turn_detection(),
                 "input_audio_format": "g711_ulaw",
                 "output_audio_format": "g711_ulaw",
                 "voice": VOICE,
@@ -49,28 +65,66 @@ class VoiceEventHandler:
                 "temperature": 0.8,
             }
         }
+        if get_settings().recording_dir:
+            # Caller-side transcripts for the recording
+            session_update["session"]["input_audio_transcription"] = {"model": "whisper-1"}
         await self.openai_ws.send(json.dumps(session_update))
 
+    async def update_turn_detection(self):
+        """Push the current VAD settings to OpenAI mid-call."""
+        print(f"Updating turn detection: {self.turns.settings}")
+        await self.openai_ws.send(json.dumps({
+            "type": "session.update",
+            "session": {"turn_detection": self.turns.settings.to_turn_detection()}
+        }))
+
+    async def send_mark(self, name: str):
+        """Ask Twilio to echo `name` back once everything sent before it has played."""
+        await self.websocket.send_json({
+            "event": "mark",
+            "streamSid": self.stream_sid,
+            "mark": {"name": name}
+        })
+
     async def handle_speech_started_event(self):
         """Handle interruption when user starts speaking."""
-        print(f"User interrupted! Cancelling current response... (StreamSid: {self.stream_sid})")
-        
+        # Stop upstream generation first so no more audio is produced (or billed)
+        if self.active_response_id:
+            print(f"User interrupted! Cancelling response {self.active_response_id}... (StreamSid: {self.stream_sid})")
+            self.cancelled_response_id = self.active_response_id
+            self.active_response_id = None
+            await self.openai_ws.send(json.dumps({"type": "response.cancel"}))
+
+        if not self.playback.is_playing:
+            return
+
+        # Capture the playback position before clearing Twilio's buffer
+        item_id = self.playback.item_id
+        audio_end_ms = self.playback.truncation_point()
+        unplayed_ms = self.playback.unplayed_ms()
+
         # Clear Twilio's audio buffer to stop playback immediately
         if self.stream_sid:
-            clear_event = {
+            await self.websocket.send_json({
                 "event": "clear",
                 "streamSid": self.stream_sid
-            }
-            await self.websocket.send_json(clear_event)
-            # print("Sent clear event to Twilio")
-        
-        # Cancel the current OpenAI response if one is in progress
-        if self.last_assistant_item_id:
-            cancel_event = {
-                "type": "response.cancel"
-            }
-            await self.openai_ws.send(json.dumps(cancel_event))
-            # print("Sent response.cancel to OpenAI")
+            })
+        self.playback.reset()
+        if self.recorder:
+            # The recording should hold what the caller heard, not what Twilio just discarded
+            self.recorder.drop_outbound(int(unplayed_ms * ULAW_BYTES_PER_MS))
+
+        # Drop the unheard part of the assistant's answer from the model's context
+        if audio_end_ms is not None:
+            print(f"Truncating {item_id} at {audio_end_ms} ms")
+            if self.recorder:
+                self.recorder.add_transcript("system", f"assistant interrupted at {audio_end_ms} ms")
+            await self.openai_ws.send(json.dumps({
+                "type": "conversation.item.truncate",
+                "item_id": item_id,
+                "content_index": 0,
+                "audio_end_ms": audio_end_ms
+            }))
 
     async def send_filler_audio(self):
         """
@@ -79,16 +133,19 @@ class VoiceEventHandler:
         if not self.stream_sid:
             return
             
-        from app.config import FILLER_AUDIO
+        filler_audio = get_settings().filler_audio
         
-        if FILLER_AUDIO:
+        if filler_audio:
             # print(">> PLAYING FILLER AUDIO: 'Let me look that up for you...' [Typing Sounds] <<")
             try:
                 await self.websocket.send_json({
                     "event": "media",
                     "streamSid": self.stream_sid,
-                    "media": {"payload": FILLER_AUDIO}
+                    "media": {"payload": filler_audio}
                 })
+                if self.recorder:
+                    self.recorder.tee_outbound(filler_audio)
+                await self.send_mark(self.playback.filler_sent(filler_audio))
             except Exception as e:
                 print(f"Error sending filler audio: {e}")
         else:
@@ -110,10 +167,25 @@ class VoiceEventHandler:
                     }
                     if self.openai_ws:
                         await self.openai_ws.send(json.dumps(audio_payload))
+                    if self.recorder:
+                        self.recorder.tee_inbound(data["media"]["payload"])
                     
                 elif event_type == "start":
                     self.stream_sid = data['start']['streamSid']
                     print(f"Incoming Stream Started: {self.stream_sid}")
+                    self.recorder = create_recorder(self.stream_sid)
+
+                    # Per-call VAD profile from /twiml query parameters
+                    params = data['start'].get('customParameters') or {}
+                    if any(name.startswith("vad") for name in params):
+                        adaptive = str(params.get("vad_adaptive", "")).lower() in ("1", "true", "yes")
+                        self.turns = TurnTracker(VadSettings.from_parameters(params), adaptive=adaptive)
+                        if self.openai_ws:
+                            await self.update_turn_detection()
+                
+                elif event_type == "mark":
+                    # Twilio finished playing everything up to this mark
+                    self.playback.mark_received(data.get("mark", {}).get("name"))
                 
                 elif event_type == "stop":
                     print("Twilio Stream Stopped")
@@ -125,8 +197,8 @@ class VoiceEventHandler:
     async def receive_from_openai(self):
         """Receive audio from OpenAI and send to Twilio."""
         audio_chunks_received = 0
-        from app.services.rag_client import RagClient
-        rag_client = RagClient()
+        from app.services.rag_client import get_rag_client
+        rag_client = get_rag_client()
 
         try:
             async for message in self.openai_ws:
@@ -145,12 +217,28 @@ class VoiceEventHandler:
                 
                 elif event_type == "input_audio_buffer.speech_started":
                     # User started speaking - handle interruption!
+                    self.turns.speech_started(
+                        data.get("audio_start_ms"),
+                        assistant_speaking=bool(self.active_response_id) or self.playback.is_playing
+                    )
                     await self.handle_speech_started_event()
+
+                elif event_type == "input_audio_buffer.speech_stopped":
+                    if self.turns.speech_stopped(data.get("audio_end_ms")):
+                        await self.update_turn_detection()
                     
+                elif event_type == "response.created":
+                    self.active_response_id = data.get("response", {}).get("id")
+
                 elif event_type == "response.audio.delta":
+                    if data.get("response_id") and data.get("response_id") == self.cancelled_response_id:
+                        # Already interrupted; don't play audio that arrived after the cancel
+                        continue
+
                     audio_chunks_received += 1
                     if audio_chunks_received == 1:
                         print(f"Receiving audio from OpenAI... (StreamSid: {self.stream_sid})")
+                        self.turns.response_audio_started()
                     
                     if "delta" in data and self.stream_sid:
                         audio_payload = {
@@ -161,9 +249,13 @@ class VoiceEventHandler:
                             }
                         }
                         await self.websocket.send_json(audio_payload)
+                        await self.send_mark(self.playback.chunk_sent(data.get("item_id"), data['delta']))
+                        if self.recorder:
+                            self.recorder.tee_outbound(data['delta'])
 
                 elif event_type == "response.function_call_arguments.done":
                     # --- VOICE RAG LOGIC ---
+                    self.turns.tool_call_started()
                     print(f"Function Call Detected: {data}")
                     call_id = data.get("call_id")
                     args = json.loads(data.get("arguments", "{}"))
@@ -199,12 +291,14 @@ class VoiceEventHandler:
                             "type": "response.create"
                         }))
                 
-                elif event_type == "conversation.item.created":
-                    # Track assistant response items for cancellation
-                    item = data.get("item", {})
-                    if item.get("role") == "assistant":
-                        self.last_assistant_item_id = item.get("id")
-                        
+                elif event_type == "conversation.item.input_audio_transcription.completed":
+                    if self.recorder:
+                        self.recorder.add_transcript("user", data.get("transcript", ""))
+
+                elif event_type == "response.audio_transcript.done":
+                    if self.recorder:
+                        self.recorder.add_transcript("assistant", data.get("transcript", ""))
+
                 elif event_type == "response.audio.done":
                     audio_chunks_received = 0
                         
@@ -219,8 +313,9 @@ class VoiceEventHandler:
                     if status == 'failed':
                          print(f"FAILED DETAILS: {response.get('status_details')}")
                          
-                    # Clear the item ID when response is complete
-                    self.last_assistant_item_id = None
+                    # Response is complete (its audio may still be playing on Twilio)
+                    if response.get('id') == self.active_response_id:
+                        self.active_response_id = None
 
         except Exception as e:
             print(f"Error processing OpenAI message: {e}")
@@ -0,0 +1,115 @@
+"""
+Cold start benchmark.
+
+Measures, in fresh interpreters:
+  1. How long `import main` takes, with no secrets in the environment.
+  2. Latency of the first requests served by the app (startup/lifespan included),
+     once with the background warm-up and once without it. The first /whatsapp
+     message is where lazy client creation and the RAG login land when there is
+     no warm-up. RAG HTTP calls are stubbed with a fixed simulated round trip.
+     startup_ms ends when the app is serving; warm_up_ms is the background
+     warm-up that finishes after that (it must not block startup).
+
+Usage: python bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Simulated network round trip for each stubbed RAG HTTP call
+STUB_RTT_MS = 50
+
+IMPORT_SNIPPET = """
+import time, json
+t0 = time.perf_counter()
+import main
+print(json.dumps({"import_ms": (time.perf_counter() - t0) * 1000}))
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import asyncio, json, threading, time, types
+WARM_UP = %(warm_up)s
+STUB_RTT_MS = %(stub_rtt_ms)d
+
+t0 = time.perf_counter()
+import main
+import httpx
+from fastapi.testclient import TestClient
+from app.services import chat_service, rag_client
+
+# Stub the RAG API at the transport level so the real client code (lazy creation, login) still runs
+async def _rag_api(request):
+    await asyncio.sleep(STUB_RTT_MS / 1000)
+    if request.url.path.endswith("/auth/login"):
+        return httpx.Response(200, json={"token": "bench"})
+    return httpx.Response(200, text=json.dumps({"answer": "stub"}))
+
+_AsyncClient = httpx.AsyncClient
+rag_client.httpx = types.SimpleNamespace(
+    AsyncClient=lambda **kwargs: _AsyncClient(transport=httpx.MockTransport(_rag_api), **kwargs)
+)
+
+warmed = threading.Event()
+_warm_up = chat_service.warm_up
+async def _timed_warm_up():
+    if WARM_UP:
+        await _warm_up()
+    warmed.set()
+chat_service.warm_up = _timed_warm_up
+
+with TestClient(main.app) as client:
+    t1 = time.perf_counter()
+    warmed.wait()
+    t2 = time.perf_counter()
+    client.get("/")
+    t3 = time.perf_counter()
+    client.post("/twiml", headers={"host": "bench.local"})
+    t4 = time.perf_counter()
+    client.post("/whatsapp", data={"Body": "bench question", "From": "whatsapp:+10000000000"})
+    t5 = time.perf_counter()
+print(json.dumps({
+    "startup_ms": (t1 - t0) * 1000,
+    "warm_up_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "first_twiml_ms": (t4 - t3) * 1000,
+    "first_whatsapp_ms": (t5 - t4) * 1000,
+}))
+"""
+
+
+def run_snippet(snippet: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True, text=True, env=env, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list, key: str) -> str:
+    values = [s[key] for s in samples]
+    return f"{key:>18}: median {statistics.median(values):8.1f} ms  min {min(values):8.1f} ms  max {max(values):8.1f} ms"
+
+
+def main(runs: int = 5):
+    # Importing must work without secrets, so the key is removed rather than faked
+    import_env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    imports = [run_snippet(IMPORT_SNIPPET, import_env) for _ in range(runs)]
+
+    # Serving requests needs valid settings; keep any local FAQ index out of the measurement
+    request_env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-bench"),
+                       FAQ_INDEX_DIR="bench_no_faq_index")
+
+    print(f"Cold start over {runs} runs (stubbed RAG round trip: {STUB_RTT_MS} ms)")
+    print(summarize(imports, "import_ms"))
+    for warm_up in (True, False):
+        snippet = FIRST_REQUEST_SNIPPET % {"warm_up": warm_up, "stub_rtt_ms": STUB_RTT_MS}
+        requests = [run_snippet(snippet, request_env) for _ in range(runs)]
+        print(f"-- {'with' if warm_up else 'without'} warm-up")
+        for key in ("startup_ms", "warm_up_ms", "first_request_ms", "first_twiml_ms", "first_whatsapp_ms"):
+            print(summarize(requests, key))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,127 @@
+"""
+Build (or incrementally refresh) the pre-computed FAQ answer index.
+
+Reads historical questions (one per line; repeats count as frequency), runs the
+top N through the RAG API and stores the answers plus question embeddings in
+FAQ_INDEX_DIR (default: faq_index/). The running server picks up the new index
+automatically.
+
+Incremental: questions already in the index keep their embedding, and their
+answer is only re-fetched once it is older than --max-age-hours.
+
+Usage: python build_faq_index.py questions.txt --top 100 [--max-age-hours 24]
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+from collections import Counter
+
+from app.config import get_settings
+from app.services.chat_service import get_openai_client, shutdown
+from app.services.faq_index import FaqIndex, embed, normalize, write_index
+from app.services.rag_client import get_rag_client, is_fallback_answer
+
+# Parallel RAG queries while building
+RAG_CONCURRENCY = 4
+
+
+def top_questions(path: str, top: int) -> list:
+    """Most frequent questions, deduplicated on their normalized form."""
+    counts = Counter()
+    first_seen = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            question = line.strip()
+            key = normalize(question)
+            if not key:
+                continue
+            counts[key] += 1
+            first_seen.setdefault(key, question)
+    return [first_seen[key] for key, _ in counts.most_common(top)]
+
+
+def load_existing(directory: str) -> dict:
+    """Existing entries and their vectors, keyed by normalized question."""
+    try:
+        index = FaqIndex(directory)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"No usable existing index ({e}); building from scratch")
+        return {}
+    return {normalize(entry["question"]): (entry, index.vector(i)) for i, entry in enumerate(index.entries)}
+
+
+def answer_hash(answer: str) -> str:
+    return hashlib.sha256(answer.encode("utf-8")).hexdigest()[:16]
+
+
+async def build(questions_path: str, top: int, max_age_hours: float):
+    directory = get_settings().faq_index_dir
+    questions = top_questions(questions_path, top)
+    existing = load_existing(directory)
+    rag_client = get_rag_client()
+    semaphore = asyncio.Semaphore(RAG_CONCURRENCY)
+    now = time.time()
+
+    async def fetch(question: str):
+        async with semaphore:
+            return await rag_client.query(question)
+
+    to_fetch = []
+    for question in questions:
+        known = existing.get(normalize(question))
+        if known is None or now - known[0].get("answered_at", 0) > max_age_hours * 3600:
+            to_fetch.append(question)
+    print(f"{len(questions)} questions, {len(to_fetch)} need a fresh RAG answer")
+
+    answers = dict(zip(to_fetch, await asyncio.gather(*(fetch(q) for q in to_fetch))))
+
+    entries, vectors, new_questions = [], [], []
+    changed = failed = 0
+    for question in questions:
+        key = normalize(question)
+        known = existing.get(key)
+        if question in answers:
+            answer = answers[question]
+            if is_fallback_answer(answer):
+                failed += 1
+                if known is None:
+                    continue
+                # Keep serving the previous answer until the RAG API answers again
+                entries.append(known[0])
+                vectors.append(known[1])
+                continue
+            entry = {"question": question, "answer": answer, "answer_hash": answer_hash(answer), "answered_at": now}
+            if known is not None and known[0].get("answer_hash") != entry["answer_hash"]:
+                changed += 1
+        else:
+            entry = known[0]
+
+        entries.append(entry)
+        if known is not None:
+            vectors.append(known[1])
+        else:
+            vectors.append(None)
+            new_questions.append(len(entries) - 1)
+
+    if new_questions:
+        print(f"Embedding {len(new_questions)} new questions...")
+        new_vectors = await embed(get_openai_client(), [entries[i]["question"] for i in new_questions])
+        for i, vector in zip(new_questions, new_vectors):
+            vectors[i] = vector
+
+    write_index(directory, entries, vectors)
+    print(f"Saved {len(entries)} entries to {directory} "
+          f"({len(new_questions)} new, {changed} answers changed, {failed} RAG failures, "
+          f"{len(existing) - (len(entries) - len(new_questions))} dropped)")
+    await shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the pre-computed FAQ answer index.")
+    parser.add_argument("questions", help="Text file with one historical question per line")
+    parser.add_argument("--top", type=int, default=100, help="Number of most frequent questions to index")
+    parser.add_argument("--max-age-hours", type=float, default=24,
+                        help="Re-query RAG for indexed answers older than this")
+    args = parser.parse_args()
+    asyncio.run(build(args.questions, args.top, args.max_age_hours))
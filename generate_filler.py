@@ -1,16 +1,12 @@
-import os
 import openai
 import base64
 import audioop
 import wave
 import io
-from dotenv import load_dotenv
-
-# Load Env
-load_dotenv('.env.local')
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+from app.config import get_settings
 
 def generate_filler():
+    client = openai.OpenAI(api_key=get_settings().openai_api_key)
     print("Generating audio from OpenAI TTS...")
     response = client.audio.speech.create(
         model="tts-1",
@@ -1,9 +1,22 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.config import PORT
+from app.config import get_settings
 from app.routers.whatsapp import router as whatsapp_router
 from app.routers.voice import router as voice_router
+from app.services import chat_service
 
-app = FastAPI(title="Unified LLM Server (WhatsApp & Voice)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Validate settings up front, then warm the clients in the background
+    # so startup isn't blocked on the RAG login round trip.
+    get_settings()
+    warm_up_task = asyncio.create_task(chat_service.warm_up())
+    yield
+    warm_up_task.cancel()
+    await chat_service.shutdown()
+
+app = FastAPI(title="Unified LLM Server (WhatsApp & Voice)", lifespan=lifespan)
 
 # Register Routers
 app.include_router(whatsapp_router) # Handles /whatsapp
@@ -15,6 +28,7 @@ async def root():
         "message": "Unified Server Running",
         "endpoints": {
             "whatsapp": "POST /whatsapp",
+            "faq_stats": "GET /whatsapp/faq-stats",
             "voice_webhook": "POST /twiml",
             "voice_websocket": "WSS /websocket"
         }
@@ -22,4 +36,4 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    uvicorn.run(app, host="0.0.0.0", port=get_settings().port)
@@ -0,0 +1,94 @@
+import base64
+import os
+import struct
+import tempfile
+import time
+from app.services.call_recorder import CallRecorder, FrameRing, FRAME_OVERHEAD_BYTES, WAV_FORMAT_MULAW
+
+def payload(n_bytes: int, byte: bytes = b"\xff") -> str:
+    return base64.b64encode(byte * n_bytes).decode()
+
+def read_wav(path: str) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+    chunks, offset = {}, 12
+    while offset < len(data):
+        name, size = data[offset:offset + 4], struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        chunks[name] = data[offset + 8:offset + 8 + size]
+        offset += 8 + size + size % 2
+    return {"riff_size": struct.unpack("<I", data[4:8])[0], "file_size": len(data), **chunks}
+
+def test_ring_drops_and_releases():
+    ring = FrameRing(max_bytes=300)
+    assert ring.push(("inbound", "a"), 100)
+    assert ring.push(("inbound", "b"), 200)
+    assert not ring.push(("inbound", "c"), 1)
+    assert ring.dropped == 1
+
+    # Draining releases the budget for new frames
+    assert ring.drain() == [("inbound", "a"), ("inbound", "b")]
+    assert ring.push(("inbound", "d"), 300)
+    assert ring.dropped == 1
+
+def test_wav_header_and_padding():
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = CallRecorder(directory, "MZ1", max_buffer_bytes=1 << 20)
+        recorder.tee_inbound(payload(161))  # Odd length needs a pad byte
+        recorder.tee_outbound(payload(160))
+        recorder.add_transcript("user", "مرحبا")
+        stats = recorder.close()
+        assert stats == {"path": os.path.join(directory, "MZ1"), "dropped_frames": 0, "failed": False}
+
+        wav = read_wav(os.path.join(directory, "MZ1", "inbound.wav"))
+        print("Inbound WAV:", {k: v if isinstance(v, int) else len(v) for k, v in wav.items()})
+        assert wav["riff_size"] == wav["file_size"] - 8
+        assert wav["file_size"] % 2 == 0
+        assert struct.unpack("<HHI", wav[b"fmt "][:8]) == (WAV_FORMAT_MULAW, 1, 8000)
+        assert struct.unpack("<I", wav[b"fact"])[0] == 161
+        assert wav[b"data"] == b"\xff" * 161
+        with open(os.path.join(directory, "MZ1", "transcript.jsonl"), encoding="utf-8") as f:
+            assert "مرحبا" in f.read()
+
+def test_barge_in_drops_unplayed_outbound():
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = CallRecorder(directory, "MZ2", max_buffer_bytes=1 << 20)
+        recorder.tee_outbound(payload(800, b"\x01"))
+        recorder.tee_outbound(payload(800, b"\x02"))
+        # Caller barged in 50 ms into the second 100 ms chunk: its last 50 ms were never played
+        recorder.drop_outbound(50 * 8)
+        recorder.tee_outbound(payload(80, b"\x03"))
+        recorder.close()
+
+        wav = read_wav(os.path.join(directory, "MZ2", "outbound.wav"))
+        assert wav[b"data"] == b"\x01" * 800 + b"\x02" * 400 + b"\x03" * 80
+        assert struct.unpack("<I", wav[b"fact"])[0] == 1280
+        assert wav["riff_size"] == wav["file_size"] - 8
+
+def test_drop_after_flush_to_disk():
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = CallRecorder(directory, "MZ3", max_buffer_bytes=1 << 20)
+        recorder.tee_outbound(payload(800))
+        # Let the writer take the chunk in an earlier batch than the drop
+        deadline = time.monotonic() + 5
+        while recorder.ring._frames and time.monotonic() < deadline:
+            time.sleep(0.01)
+        recorder.drop_outbound(10_000)  # More than was sent: clamp to empty
+        recorder.close()
+        wav = read_wav(os.path.join(directory, "MZ3", "outbound.wav"))
+        assert wav[b"data"] == b""
+
+def test_writer_failure_stops_buffering():
+    with tempfile.TemporaryDirectory() as directory:
+        # A file where the recording directory should be makes the writer's setup fail
+        blocker = os.path.join(directory, "blocker")
+        open(blocker, "w").close()
+        recorder = CallRecorder(blocker, "MZ4", max_buffer_bytes=FRAME_OVERHEAD_BYTES * 10)
+        stats = recorder.close()
+        print("Failed recorder:", stats)
+        assert stats["failed"] and not recorder.writer_alive
+
+        for _ in range(100):
+            recorder.tee_inbound(payload(160))
+        assert recorder.ring.drain() == []
+        assert recorder.ring.dropped == 0
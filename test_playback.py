@@ -0,0 +1,90 @@
+import base64
+import types
+import pytest
+from app.services import playback
+from app.services.playback import PlaybackTracker
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Deterministic clock (in ms) for the playhead estimate, restored after each test."""
+    now = [0]
+    monkeypatch.setattr(playback, "time", types.SimpleNamespace(perf_counter=lambda: now[0] / 1000))
+    return now
+
+def chunk(ms: int) -> str:
+    """Base64 u-law payload lasting `ms` milliseconds."""
+    return base64.b64encode(b"\xff" * (ms * playback.ULAW_BYTES_PER_MS)).decode()
+
+def test_barge_in_mid_chunk(clock):
+    tracker = PlaybackTracker()
+    first = tracker.chunk_sent("item_1", chunk(200))
+    tracker.chunk_sent("item_1", chunk(200))
+
+    clock[0] += 200
+    tracker.mark_received(first)
+    assert tracker.played_ms == 200
+    assert tracker.is_playing
+
+    # Caller speaks 50 ms into the second chunk
+    clock[0] += 50
+    print("Barge-in mid-chunk:", tracker.truncation_point())
+    assert tracker.truncation_point() == 250
+
+def test_filler_at_head_of_queue(clock):
+    tracker = PlaybackTracker()
+    filler = tracker.filler_sent()
+    tracker.chunk_sent("item_1", chunk(200))
+
+    # Filler is still playing: none of the item has been heard yet
+    clock[0] += 100
+    assert tracker.audio_end_ms() == 0
+    assert tracker.truncation_point() == 0
+
+    clock[0] += 500
+    tracker.mark_received(filler)
+    clock[0] += 80
+    print("Barge-in after filler:", tracker.truncation_point())
+    assert tracker.truncation_point() == 80
+
+def test_late_mark_after_reset(clock):
+    tracker = PlaybackTracker()
+    old = tracker.chunk_sent("item_1", chunk(200))
+    tracker.reset()
+
+    # Twilio may still echo marks that were queued before the clear
+    tracker.mark_received(old)
+    assert not tracker.is_playing
+    assert tracker.played_ms == 0
+
+    new = tracker.chunk_sent("item_2", chunk(100))
+    tracker.mark_received(old)
+    assert tracker.is_playing
+    tracker.mark_received(new)
+    print("After late mark:", tracker.item_id, tracker.played_ms)
+    assert tracker.played_ms == 100
+    assert not tracker.is_playing
+
+def test_only_filler_queued_after_full_playback(clock):
+    tracker = PlaybackTracker()
+    mark = tracker.chunk_sent("item_1", chunk(200))
+    tracker.mark_received(mark)
+    tracker.filler_sent()
+
+    # The item was heard in full, so there is nothing to truncate
+    assert tracker.is_playing
+    print("Only filler queued:", tracker.truncation_point())
+    assert tracker.truncation_point() is None
+
+def test_unplayed_includes_filler(clock):
+    tracker = PlaybackTracker()
+    filler = tracker.filler_sent(chunk(100))
+    tracker.chunk_sent("item_1", chunk(200))
+
+    clock[0] += 60
+    assert tracker.unplayed_ms() == pytest.approx(240)
+    clock[0] += 40
+    tracker.mark_received(filler)
+    clock[0] += 150
+    # What a clear would discard, and so what the recording must drop
+    print("Unplayed after barge-in:", tracker.unplayed_ms())
+    assert tracker.unplayed_ms() == pytest.approx(50)
@@ -0,0 +1,107 @@
+import types
+import pytest
+from app.services import vad_tuner
+from app.services.vad_tuner import VadSettings, TurnTracker
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Deterministic clock (in ms) for the tracker, restored after each test."""
+    now = [0]
+    monkeypatch.setattr(vad_tuner, "time", types.SimpleNamespace(perf_counter=lambda: now[0] / 1000))
+    return now
+
+def turn(tracker, clock, speech_ms=2000, reply_ms=200, barge_in=False, tool=False):
+    """One caller turn: speech, VAD silence, (optional tool call), first reply audio, reply playing."""
+    tracker.speech_started(0, assistant_speaking=barge_in)
+    clock[0] += speech_ms
+    adapted = tracker.speech_stopped(speech_ms)
+    if tool:
+        tracker.tool_call_started()
+    clock[0] += reply_ms
+    tracker.response_audio_started()
+    clock[0] += 3000  # Well past CUT_OFF_WINDOW_MS before the next turn
+    return adapted
+
+def settings(**params):
+    return VadSettings.from_parameters(params)
+
+# --- VadSettings.from_parameters ---
+
+def test_profiles():
+    assert settings() == VadSettings(0.5, 300, 500)
+    assert settings(vad="noisy") == VadSettings(0.7, 400, 650)
+    assert settings(vad="no-such-profile") == settings()
+
+def test_bad_override_keeps_the_others():
+    assert settings(vad_threshold="abc", vad_silence_duration_ms="600") == VadSettings(0.5, 300, 600)
+    assert settings(vad_threshold="nan", vad_prefix_padding_ms="inf") == settings()
+
+def test_overrides_are_clamped():
+    clamped = settings(vad_threshold="5", vad_prefix_padding_ms="9999", vad_silence_duration_ms="-5")
+    print("Clamped:", clamped)
+    assert clamped == VadSettings(vad_tuner.MAX_THRESHOLD, vad_tuner.MAX_PADDING_MS, vad_tuner.MIN_SILENCE_MS)
+
+# --- Turn latency ---
+
+def test_latency_counts_from_last_word(clock):
+    tracker = TurnTracker(settings())
+    turn(tracker, clock, reply_ms=300)
+    # 300 ms after speech_stopped, plus the 500 ms silence VAD waited out
+    assert tracker.turn_latencies_ms == [pytest.approx(800)]
+
+def test_tool_turns_are_reported_separately(clock):
+    tracker = TurnTracker(settings())
+    turn(tracker, clock, reply_ms=2500, tool=True)
+    assert tracker.turn_latencies_ms == []
+    assert tracker.tool_turn_latencies_ms == [pytest.approx(3000)]
+
+# --- TurnTracker._adapt ---
+
+def test_slow_tool_turns_leave_silence_alone(clock):
+    tracker = TurnTracker(settings(), adaptive=True)
+    for _ in range(30):
+        turn(tracker, clock, reply_ms=2500, tool=True)
+    assert tracker.settings == settings()
+
+def test_silence_shortened_only_when_it_dominates(clock):
+    # 800 ms silence + 300 ms reply: slow, and silence is most of it
+    tracker = TurnTracker(settings(vad_silence_duration_ms="800"), adaptive=True)
+    for _ in range(30):
+        turn(tracker, clock, reply_ms=300)
+    print("Shortened silence:", tracker.settings.silence_duration_ms)
+    assert tracker.settings.silence_duration_ms == 550  # Stops once 550 + 300 <= target
+
+    # 500 ms silence + 700 ms reply: slow, but the model is the main cost
+    tracker = TurnTracker(settings(), adaptive=True)
+    for _ in range(30):
+        turn(tracker, clock, reply_ms=700)
+    assert tracker.settings == settings()
+
+def test_false_interrupts_raise_threshold_and_silence(clock):
+    tracker = TurnTracker(settings(), adaptive=True)
+    results = [turn(tracker, clock, speech_ms=200, barge_in=True) for _ in range(3)]
+    assert results[-1] == VadSettings(0.55, 350, 550)
+    assert tracker.false_interrupts == 3
+
+def test_cut_offs_lengthen_silence(clock):
+    tracker = TurnTracker(settings(), adaptive=True)
+    for _ in range(3):
+        tracker.response_audio_started()
+        clock[0] += 500  # Caller keeps talking right after the reply starts
+        turn(tracker, clock, speech_ms=1500, barge_in=True)
+    assert tracker.cut_offs == 3
+    assert tracker.settings == VadSettings(0.5, 300, 550)
+
+def test_genuine_barge_ins_lower_threshold(clock):
+    tracker = TurnTracker(settings(), adaptive=True)
+    for _ in range(3):
+        turn(tracker, clock, speech_ms=1500, barge_in=True)
+    assert tracker.cut_offs == 0 and tracker.false_interrupts == 0
+    assert tracker.settings == VadSettings(0.45, 300, 500)
+
+def test_not_adaptive_never_changes(clock):
+    tracker = TurnTracker(settings())
+    for _ in range(6):
+        turn(tracker, clock, speech_ms=200, barge_in=True)
+    assert tracker.settings == settings()
+    assert tracker.summary()["false_interrupts"] == 6
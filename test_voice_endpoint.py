@@ -7,6 +7,7 @@ async def test_twiml():
     # Mock Request
     request = MagicMock()
     request.headers.get.return_value = "test.ngrok.io"
+    request.query_params = {"vad": "noisy", "vad_adaptive": "true"}
     
     print("Testing /twiml endpoint...")
     try: